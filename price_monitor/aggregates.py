@@ -0,0 +1,288 @@
+import json
+import re
+import time
+from heapq import heappop, heappush
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_WINDOWS = ["1h", "24h", "7d"]
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_window(spec) -> int:
+    """Переводит описание окна ("1h", "24h", "7d") в секунды"""
+    if isinstance(spec, (int, float)):
+        return int(spec)
+    match = re.fullmatch(r"\s*(\d+)\s*([smhdw])\s*", str(spec).lower())
+    if not match:
+        raise ValueError(f"Некорректное окно агрегации: {spec}")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+def sku_key(sku) -> str:
+    """Ключ SKU: 2001, "2001" и 2001.0 (после dropna в pandas) совпадают"""
+    if isinstance(sku, float) and sku.is_integer():
+        sku = int(sku)
+    return str(sku)
+
+
+class RollingWindow:
+    """Скользящее окно цен с min/max/mean/median за O(log n) на обновление.
+
+    Наблюдения могут приходить не по порядку времени (догрузка истории):
+    все структуры - кучи с ленивым удалением, а окно отсчитывается от
+    самого позднего известного момента.
+    """
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.now = float("-inf")  # самый поздний момент, до которого сдвинуто окно
+        self.items = []           # куча (ts, seq, price) для вытеснения по времени
+        self.alive = {}           # seq -> True, если цена в нижней половине (медиана)
+        self.min_h = []           # (price, seq)
+        self.max_h = []           # (-price, seq)
+        self.low = []             # нижняя половина цен: (-price, seq)
+        self.high = []            # верхняя половина цен: (price, seq)
+        self.low_size = 0
+        self.high_size = 0
+        self.total = 0.0
+        self.seq = 0
+
+    def _prune(self, heap):
+        """Снимает с вершины кучи уже удаленные элементы"""
+        while heap and heap[0][1] not in self.alive:
+            heappop(heap)
+
+    def _rebalance(self):
+        """Держит в нижней половине столько же цен или на одну больше"""
+        while self.low_size > self.high_size + 1:
+            self._prune(self.low)
+            neg_price, seq = heappop(self.low)
+            heappush(self.high, (-neg_price, seq))
+            self.alive[seq] = False
+            self.low_size -= 1
+            self.high_size += 1
+        while self.high_size > self.low_size:
+            self._prune(self.high)
+            price, seq = heappop(self.high)
+            heappush(self.low, (-price, seq))
+            self.alive[seq] = True
+            self.high_size -= 1
+            self.low_size += 1
+        self._prune(self.low)
+        self._prune(self.high)
+
+    def add(self, ts: float, price: float) -> bool:
+        """Добавляет наблюдение; слишком старые для окна пропускаются"""
+        self.evict(ts)
+        if ts <= self.now - self.seconds:
+            return False
+
+        seq = self.seq
+        self.seq += 1
+        heappush(self.items, (ts, seq, price))
+        heappush(self.min_h, (price, seq))
+        heappush(self.max_h, (-price, seq))
+        self.total += price
+
+        if not self.low or price <= -self.low[0][0]:
+            heappush(self.low, (-price, seq))
+            self.alive[seq] = True
+            self.low_size += 1
+        else:
+            heappush(self.high, (price, seq))
+            self.alive[seq] = False
+            self.high_size += 1
+        self._rebalance()
+        return True
+
+    def evict(self, now: float):
+        """Сдвигает окно к моменту now и удаляет наблюдения старше границы"""
+        self.now = max(self.now, now)
+        cutoff = self.now - self.seconds
+        while self.items and self.items[0][0] <= cutoff:
+            _, seq, price = heappop(self.items)
+            self.total -= price
+            if self.alive.pop(seq):
+                self.low_size -= 1
+            else:
+                self.high_size -= 1
+        self._prune(self.min_h)
+        self._prune(self.max_h)
+        self._rebalance()
+
+    def observations(self) -> list:
+        """Наблюдения окна в виде пар (ts, price)"""
+        return sorted((ts, price) for ts, _, price in self.items)
+
+    def stats(self) -> dict:
+        """Текущие агрегаты окна"""
+        n = len(self.items)
+        if not n:
+            return {"count": 0, "min": None, "max": None, "mean": None, "median": None}
+        if self.low_size > self.high_size:
+            median = -self.low[0][0]
+        else:
+            median = (-self.low[0][0] + self.high[0][0]) / 2
+        return {
+            "count": n,
+            "min": self.min_h[0][0],
+            "max": -self.max_h[0][0],
+            "mean": self.total / n,
+            "median": median,
+        }
+
+
+class SkuAggregates:
+    """Агрегаты цен конкурентов по одному SKU для набора окон"""
+
+    def __init__(self, windows: dict):
+        self.windows = {name: RollingWindow(sec) for name, sec in windows.items()}
+        self.latest = {}      # (source_site, comp_url) -> {"ts", "price", "name"}
+        self.last_ts = 0.0
+
+    def add(self, ts: float, site: str, price: float, name: str = "", url: str = ""):
+        # Наблюдение сохраняет свое время: запоздавшее попадает только
+        # в те окна, которые его еще покрывают
+        self.last_ts = max(ts, self.last_ts)
+        for window in self.windows.values():
+            window.add(ts, price)
+        key = (site, url)
+        if key not in self.latest or ts >= self.latest[key]["ts"]:
+            self.latest[key] = {"ts": ts, "price": price, "name": name}
+
+    def listings(self, seconds: int, now: float) -> dict:
+        """Предложения конкурентов, чьи последние цены попадают в окно"""
+        return {
+            key: obs for key, obs in self.latest.items()
+            if obs["ts"] > now - seconds
+        }
+
+
+class PriceAggregator:
+    """Онлайн-агрегация цен конкурентов по SKU со скользящими окнами"""
+
+    def __init__(self, windows=None):
+        windows = windows or DEFAULT_WINDOWS
+        self.windows = {str(w): parse_window(w) for w in windows}
+        self.skus = {}
+        self.seen = {}        # (sku, source_site, comp_url) -> ts последнего наблюдения
+
+    def _sku(self, sku) -> SkuAggregates:
+        key = sku_key(sku)
+        if key not in self.skus:
+            self.skus[key] = SkuAggregates(self.windows)
+        return self.skus[key]
+
+    def add(self, sku, site: str, price: float, ts: float = None,
+            name: str = "", url: str = "") -> bool:
+        """Добавляет одно наблюдение. Повторы уже учтенных цен пропускаются"""
+        ts = time.time() if ts is None else float(ts)
+        key = (sku_key(sku), site, url)
+        if key in self.seen and ts <= self.seen[key]:
+            return False
+        self.seen[key] = ts
+        self._sku(sku).add(ts, site, float(price), name, url)
+        return True
+
+    def update(self, matched: pd.DataFrame, default_ts: float = None) -> int:
+        """Инкрементально добавляет сопоставленные строки (формат matched.csv)"""
+        if matched.empty:
+            return 0
+        if "scraped_at" in matched.columns:
+            matched = matched.sort_values("scraped_at", kind="stable")
+
+        added = 0
+        for row in matched.itertuples(index=False):
+            ts = getattr(row, "scraped_at", None)
+            if ts is None or pd.isna(ts):
+                ts = default_ts
+            if self.add(row.sku, row.source_site, row.comp_price, ts,
+                        row.comp_name, row.comp_url):
+                added += 1
+        return added
+
+    def to_frame(self, window: str, now: float = None) -> pd.DataFrame:
+        """Агрегаты по всем SKU за окно в формате колонок build_price_comparison.
+
+        min/max - по всем наблюдениям окна; avg/median - по последней цене
+        каждого предложения (сайт, URL). window_avg_price/window_median_price -
+        те же величины по всем наблюдениям, т.е. с весом частоты парсинга.
+        """
+        if window not in self.windows:
+            raise ValueError(f"Окно {window} не настроено: {list(self.windows)}")
+        now = time.time() if now is None else now
+        seconds = self.windows[window]
+
+        rows = []
+        for sku, agg in self.skus.items():
+            rolling = agg.windows[window]
+            rolling.evict(now)
+            stats = rolling.stats()
+            if not stats["count"]:
+                continue
+            listings = agg.listings(seconds, now)
+
+            # Средняя и медиана рынка - по текущей цене каждого предложения,
+            # чтобы часто опрашиваемый сайт не перевешивал остальных
+            current = sorted(obs["price"] for obs in listings.values())
+            mid = len(current) // 2
+            median = current[mid] if len(current) % 2 else (current[mid - 1] + current[mid]) / 2
+
+            latest_prices = {}
+            for (site, _), obs in listings.items():
+                latest_prices[site] = min(obs["price"], latest_prices.get(site, obs["price"]))
+
+            rows.append({
+                "sku": sku,
+                "min_comp_price": stats["min"],
+                "max_comp_price": stats["max"],
+                "avg_comp_price": sum(current) / len(current),
+                "median_comp_price": median,
+                "window_avg_price": stats["mean"],
+                "window_median_price": stats["median"],
+                "observations": stats["count"],
+                "competitors": len(latest_prices),
+                "comp_products": [obs["name"] for obs in listings.values()][:3],
+                "latest_prices": latest_prices,
+            })
+        return pd.DataFrame(rows)
+
+    def save(self, path):
+        """Сохраняет наблюдения в пределах самого длинного окна"""
+        horizon = max(self.windows.values())
+        data = {"windows": list(self.windows), "skus": {}, "seen": []}
+        for sku, agg in self.skus.items():
+            longest = max(agg.windows.values(), key=lambda w: w.seconds)
+            data["skus"][sku] = {
+                "observations": longest.observations(),
+                "latest": [[site, url, obs] for (site, url), obs in agg.latest.items()],
+                "last_ts": agg.last_ts,
+            }
+        cutoff = max((agg.last_ts for agg in self.skus.values()), default=0) - horizon
+        data["seen"] = [
+            [sku, site, url, ts] for (sku, site, url), ts in self.seen.items()
+            if ts > cutoff
+        ]
+        path = Path(path)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path, windows=None) -> "PriceAggregator":
+        """Восстанавливает состояние из файла; без файла возвращает пустой агрегатор"""
+        path = Path(path)
+        if not path.exists():
+            return cls(windows)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        store = cls(windows or data.get("windows"))
+        for sku, state in data["skus"].items():
+            agg = store._sku(sku)
+            for ts, price in state["observations"]:
+                for window in agg.windows.values():
+                    window.add(ts, price)
+            agg.latest = {(site, url): obs for site, url, obs in state["latest"]}
+            agg.last_ts = state["last_ts"]
+        store.seen = {(sku, site, url): ts for sku, site, url, ts in data["seen"]}
+        return store
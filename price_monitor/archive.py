@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+class PageArchive:
+    """Архив исходных страниц с адресацией по содержимому.
+
+    Каждая страница хранится один раз в objects/<sha256[:2]>/<sha256>.html.gz,
+    а каждая загрузка записывается в index.jsonl (site, url, scraper,
+    fetched_at, sha256) - аналог WARC-записи без дублирования тела.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.index_path = self.root / "index.jsonl"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}.html.gz"
+
+    def store(self, html: str, url: str, site: str, scraper: str,
+              fetched_at: float = None) -> str:
+        """Сохраняет страницу и возвращает хеш ее содержимого"""
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                f.write(gzip.compress(body))
+            os.replace(tmp, path)
+
+        record = {
+            "site": site,
+            "url": url,
+            "scraper": scraper,
+            "fetched_at": int(time.time()) if fetched_at is None else fetched_at,
+            "sha256": digest,
+        }
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return digest
+
+    def read(self, digest: str) -> str:
+        """Возвращает HTML страницы по хешу"""
+        with open(self._object_path(digest), "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    def records(self, sites=None, latest_only: bool = True) -> list:
+        """Записи индекса; по умолчанию только последняя загрузка каждого URL"""
+        if not self.index_path.exists():
+            return []
+
+        records = []
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if sites and record["site"] not in sites:
+                    continue
+                records.append(record)
+
+        if latest_only:
+            latest = {}
+            for record in records:
+                key = (record["site"], record["url"])
+                if key not in latest or record["fetched_at"] >= latest[key]["fetched_at"]:
+                    latest[key] = record
+            records = list(latest.values())
+        return records
+
+
+def extract_page(html: str, site_cfg: dict, page_url: str) -> list:
+    """Извлекает товары из страницы тем же кодом, что и при живом парсинге"""
+    t = site_cfg["type"].lower()
+    if t in ("bs4", "selenium"):
+        from price_monitor.scrapers.bs4_scraper import extract_products
+        return extract_products(html, site_cfg, page_url)
+    if t == "scrapy":
+        from price_monitor.scrapers.scrapy_runner import extract_products_css
+        return extract_products_css(html, site_cfg, page_url)
+    raise ValueError(f"Неизвестный тип парсера: {t}")
+
+
+def _replay_record(task) -> list:
+    """Обработка одной архивной страницы в дочернем процессе"""
+    root, record, site_cfg = task
+    html = PageArchive(root).read(record["sha256"])
+    rows = extract_page(html, site_cfg, record["url"])
+    for row in rows:
+        row["scraped_at"] = record["fetched_at"]
+    return rows
+
+
+def replay_archive(archive: PageArchive, sites: list, latest_only: bool = True,
+                   workers: int = None) -> list:
+    """Повторно извлекает товары из архивных страниц параллельно, без сети"""
+    site_cfgs = {site["name"]: site for site in sites}
+    tasks = [
+        (str(archive.root), record, site_cfgs[record["site"]])
+        for record in archive.records(site_cfgs, latest_only)
+        if record["site"] in site_cfgs
+    ]
+    if not tasks:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = list(map(_replay_record, tasks))
+    else:
+        # Страницы независимы: раздаем их пачками по всем ядрам
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_replay_record, tasks, chunksize=chunksize))
+    return [row for rows in results for row in rows]
@@ -1,21 +1,42 @@
 import pandas as pd
+from price_monitor.aggregates import sku_key
 
 def build_price_comparison(
     matched: pd.DataFrame, 
-    catalog: pd.DataFrame
+    catalog: pd.DataFrame,
+    aggregates: pd.DataFrame = None
 ) -> pd.DataFrame:
-    """Сравнивает цены конкурентов с нашими ценами"""
-    if matched.empty:
+    """Сравнивает цены конкурентов с нашими ценами.
+
+    Если переданы aggregates (PriceAggregator.to_frame), используются
+    агрегаты скользящего окна вместо пересчета по всему matched.
+    """
+    if aggregates is not None:
+        grouped = aggregates
+    elif matched.empty:
+        return pd.DataFrame()
+    else:
+        # Группируем данные по SKU
+        grouped = matched.groupby("sku").agg(
+            min_comp_price=("comp_price", "min"),
+            max_comp_price=("comp_price", "max"),
+            avg_comp_price=("comp_price", "mean"),
+            median_comp_price=("comp_price", "median"),
+            competitors=("source_site", "nunique"),
+            comp_products=("comp_name", lambda x: list(x)[:3])  # Примеры товаров
+        ).reset_index()
+        # Последние цены конкурентов есть только в агрегатах по окнам
+        grouped["latest_prices"] = [{} for _ in range(len(grouped))]
+    
+    if grouped.empty:
         return pd.DataFrame()
     
-    # Группируем данные по SKU
-    grouped = matched.groupby("sku").agg(
-        min_comp_price=("comp_price", "min"),
-        max_comp_price=("comp_price", "max"),
-        avg_comp_price=("comp_price", "mean"),
-        competitors=("source_site", "nunique"),
-        comp_products=("comp_name", lambda x: list(x)[:3])  # Примеры товаров
-    ).reset_index()
+    # SKU в агрегатах хранятся строками - приводим к типу каталога.
+    # Сохраненные агрегаты могут содержать SKU, которых уже нет в каталоге
+    if aggregates is not None:
+        keys = catalog["sku"].map(sku_key)
+        grouped = grouped[grouped["sku"].isin(keys)]
+        grouped = grouped.assign(sku=grouped["sku"].map(dict(zip(keys, catalog["sku"]))))
     
     # Объединяем с каталогом
     result = pd.merge(
@@ -35,6 +56,7 @@ def build_price_comparison(
     # Форматируем результат
     return result[[
         "sku", "name", "brand", "category", "cost", "current_price",
-        "min_comp_price", "max_comp_price", "avg_comp_price", "price_difference",
-        "price_position", "competitors", "comp_products"
+        "min_comp_price", "max_comp_price", "avg_comp_price", "median_comp_price",
+        "price_difference",
+        "price_position", "competitors", "comp_products", "latest_prices"
     ]]
\ No newline at end of file
@@ -3,6 +3,7 @@ from pathlib import Path
 import pandas as pd
 import yaml
 import os
+import time
 
 from price_monitor.scrapers.bs4_scraper import scrape_bs4
 from price_monitor.scrapers.selenium_scraper import scrape_selenium
@@ -10,12 +11,17 @@ from price_monitor.scrapers.scrapy_runner import scrape_with_scrapy
 from price_monitor.matching import match_competitors_to_catalog
 from price_monitor.compare import build_price_comparison
 from price_monitor.recommend import build_recommendations
+from price_monitor.aggregates import PriceAggregator, DEFAULT_WINDOWS
+from price_monitor.archive import PageArchive, replay_archive
+from price_monitor.simulate import build_param_grid, simulate_strategies
 
 # Определяем корневую директорию проекта
 ROOT = Path(__file__).resolve().parents[1]
 OUT = ROOT / "out"
 CFG = ROOT / "config"
 DATA = ROOT / "data"
+AGGREGATES = OUT / "price_aggregates.json"
+ARCHIVE = OUT / "archive"
 
 def load_yaml(path):
     """Загрузка YAML-конфигурации"""
@@ -26,6 +32,26 @@ def ensure_dirs():
     """Создаем выходные директории при необходимости"""
     OUT.mkdir(exist_ok=True, parents=True)
 
+def save_scraped(rows):
+    """Сохраняет собранные цены в scraped_prices.csv"""
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df["price"] = pd.to_numeric(df["price"], errors="coerce")
+        df = df.dropna(subset=["price"])
+        output_path = OUT / "scraped_prices.csv"
+        df.to_csv(output_path, index=False, encoding="utf-8")
+        print(f"\nСохранено {len(df)} строк в {output_path}")
+    else:
+        print("\n⚠️ Не собрано ни одной цены!")
+    return df
+
+def remove_stale_comparison():
+    """Удаляет comparison.csv прошлого запуска, чтобы recommend/simulate не взяли устаревшие данные"""
+    comp_path = OUT / "comparison.csv"
+    if comp_path.exists():
+        comp_path.unlink()
+        print(f"Устаревший файл {comp_path.name} удален")
+
 def cmd_scrape(args):
     """Команда сбора данных с сайтов конкурентов"""
     print("="*50)
@@ -34,6 +60,7 @@ def cmd_scrape(args):
     
     ensure_dirs()
     cfg = load_yaml(CFG / "sites.yaml")
+    archive = PageArchive(ARCHIVE)
     all_rows = []
     
     for site in cfg["sites"]:
@@ -41,11 +68,11 @@ def cmd_scrape(args):
         print(f"\n[ПАРСИНГ] {site['name']} ({t})")
         try:
             if t == "bs4":
-                rows = scrape_bs4(site)
+                rows = scrape_bs4(site, archive)
             elif t == "selenium":
-                rows = scrape_selenium(site)
+                rows = scrape_selenium(site, archive)
             elif t == "scrapy":
-                rows = scrape_with_scrapy(site)
+                rows = scrape_with_scrapy(site, archive)
             else:
                 print(f"  ⚠️ Неизвестный тип парсера: {t}")
                 rows = []
@@ -55,15 +82,42 @@ def cmd_scrape(args):
             print(f"  ❌ Ошибка при парсинге {site['name']}: {str(e)}")
 
     # Сохраняем результаты
-    df = pd.DataFrame(all_rows)
-    if not df.empty:
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
-        df = df.dropna(subset=["price"])
-        output_path = OUT / "scraped_prices.csv"
-        df.to_csv(output_path, index=False, encoding="utf-8")
-        print(f"\nСохранено {len(df)} строк в {output_path}")
+    return save_scraped(all_rows)
+
+def cmd_replay(args):
+    """Команда повторного извлечения цен из архива страниц (без сети)"""
+    print("="*50)
+    print("Повторное извлечение цен из архива...")
+    print("="*50)
+    
+    ensure_dirs()
+    cfg = load_yaml(CFG / "sites.yaml")
+    sites = cfg["sites"]
+    if args.site:
+        sites = [site for site in sites if site["name"] in args.site]
+    
+    archive = PageArchive(ARCHIVE)
+    started = time.perf_counter()
+    rows = replay_archive(archive, sites, latest_only=not args.all, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    
+    print(f"Извлечено позиций: {len(rows)} за {elapsed:.2f} с")
+    df = save_scraped(rows)
+    if df.empty:
+        print(f"Агрегаты {AGGREGATES.name} и {OUT.name}/scraped_prices.csv не изменены")
+        return df
+    
+    # Уже учтенные наблюдения агрегатор пропускает, поэтому исправленные
+    # цены попадут в агрегаты только при полной пересборке истории
+    if args.all and not args.site:
+        if AGGREGATES.exists():
+            AGGREGATES.unlink()
+        print(f"Агрегаты {AGGREGATES.name} сброшены и будут пересобраны командой analyze")
     else:
-        print("\n⚠️ Не собрано ни одной цены!")
+        print(
+            f"⚠️ Ранее учтенные цены в {AGGREGATES.name} не обновляются. "
+            "Для пересборки агрегатов выполните replay --all без --site"
+        )
     return df
 
 def cmd_analyze(args):
@@ -94,12 +148,31 @@ def cmd_analyze(args):
         print(f"Сопоставлено {len(matched)} позиций. Сохранено в {matched_path}")
     else:
         print("⚠️ Не удалось сопоставить ни одной позиции")
+        remove_stale_comparison()
         return
         
+    # Онлайн-агрегаты по окнам: учитываются только новые наблюдения
+    aggregates = None
+    window = getattr(args, "window", None) or pricing_cfg.get("comparison_window")
+    if window and window != "all":
+        windows = list(pricing_cfg.get("aggregate_windows") or DEFAULT_WINDOWS)
+        if window not in windows:
+            windows.append(window)
+        store = PriceAggregator.load(AGGREGATES, windows)
+        added = store.update(matched, default_ts=scraped_path.stat().st_mtime)
+        store.save(AGGREGATES)
+        aggregates = store.to_frame(window)
+        print(f"Новых наблюдений: {added}. Сравнение по окну {window}")
+        if aggregates.empty:
+            print(
+                f"⚠️ Все цены конкурентов старше окна {window}. "
+                "Используйте более длинное окно или --window all"
+            )
+    
     # Сравнение цен
-    comp = build_price_comparison(matched, catalog)
+    comp = build_price_comparison(matched, catalog, aggregates)
+    comp_path = OUT / "comparison.csv"
     if not comp.empty:
-        comp_path = OUT / "comparison.csv"
         comp.to_csv(comp_path, index=False, encoding="utf-8")
         print(f"Сравнение цен сохранено в {comp_path}")
         
@@ -112,6 +185,7 @@ def cmd_analyze(args):
             print(f"  Позиция: {status} | Конкурентов: {row['competitors']}")
     else:
         print("⚠️ Не удалось сравнить цены")
+        remove_stale_comparison()
 
 def cmd_recommend(args):
     """Команда генерации рекомендаций по ценам"""
@@ -148,6 +222,54 @@ def cmd_recommend(args):
     else:
         print("⚠️ Не удалось сгенерировать рекомендации")
 
+def cmd_simulate(args):
+    """Команда симуляции стратегий ценообразования по сетке параметров"""
+    print("\n" + "="*50)
+    print("Симуляция стратегий ценообразования...")
+    print("="*50)
+    
+    ensure_dirs()
+    comp_path = OUT / "comparison.csv"
+    
+    if not comp_path.exists():
+        print("❌ Файл сравнения цен не найден. Сначала выполните анализ.")
+        return
+        
+    # Загрузка данных
+    comparison = pd.read_csv(comp_path)
+    pricing_cfg = load_yaml(CFG / "pricing.yaml")
+    grid_cfg = load_yaml(CFG / "simulation.yaml")
+    
+    # Оценка всех конфигураций за один проход
+    grid = build_param_grid(grid_cfg, pricing_cfg)
+    started = time.perf_counter()
+    results = simulate_strategies(comparison, grid)
+    elapsed = time.perf_counter() - started
+    if results.empty:
+        print("⚠️ Нет данных для симуляции")
+        return
+    
+    sim_path = OUT / "simulation.csv"
+    results.to_csv(sim_path, index=False, encoding="utf-8")
+    print(f"Оценено конфигураций: {len(results)} x {len(comparison)} SKU за {elapsed:.2f} с")
+    
+    # Вывод лучших конфигураций по марже
+    print("\nЛучшие конфигурации по изменению маржи:")
+    for _, row in results.head(args.top or grid_cfg.get("top", 10)).iterrows():
+        print(
+            f"  маржа {row['min_margin_percent']}% | undercut {row['undercut_delta']} | "
+            f"raise {row['raise_delta']} | допуск {row['tolerance_percent']}% | "
+            f"округление {row['round_to']}"
+        )
+        print(
+            f"    Δ маржи: {row['margin_delta']:+.2f}₽ | ⬇️ {row['decrease']:.0f} "
+            f"⬆️ {row['increase']:.0f} 🔄 {row['keep']:.0f} | "
+            f"самые дешевые: {row['cheapest_share']:.0%}"
+        )
+    
+    print(f"\nПолные результаты сохранены в {sim_path}")
+    return results
+
 def cmd_run_all(args):
     """Выполнить все этапы последовательно"""
     cmd_scrape(args)
@@ -166,14 +288,35 @@ def main():
     scrape_parser = subparsers.add_parser("scrape", help="Собрать цены конкурентов")
     scrape_parser.set_defaults(func=cmd_scrape)
 
+    # Повторное извлечение из архива
+    replay_parser = subparsers.add_parser("replay", help="Извлечь цены из архива страниц без сети")
+    replay_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Все архивные загрузки, а не только последние; сбрасывает агрегаты по окнам"
+    )
+    replay_parser.add_argument("--site", action="append", help="Ограничить сайтами из sites.yaml")
+    replay_parser.add_argument("--workers", type=int, help="Число процессов (по умолчанию - все ядра)")
+    replay_parser.set_defaults(func=cmd_replay)
+
     # Анализ
     analyze_parser = subparsers.add_parser("analyze", help="Сопоставить и сравнить цены")
+    analyze_parser.add_argument(
+        "--window",
+        help="Окно агрегации цен (например, 1h, 24h, 7d; all - без окна). "
+             "По умолчанию comparison_window из pricing.yaml"
+    )
     analyze_parser.set_defaults(func=cmd_analyze)
 
     # Рекомендации
     recommend_parser = subparsers.add_parser("recommend", help="Сгенерировать рекомендации по ценам")
     recommend_parser.set_defaults(func=cmd_recommend)
 
+    # Симуляция стратегий
+    simulate_parser = subparsers.add_parser("simulate", help="Оценить сетку параметров pricing.yaml")
+    simulate_parser.add_argument("--top", type=int, help="Сколько лучших конфигураций вывести")
+    simulate_parser.set_defaults(func=cmd_simulate)
+
     # Все этапы
     all_parser = subparsers.add_parser("run-all", help="Выполнить все этапы последовательно")
     all_parser.set_defaults(func=cmd_run_all)
@@ -59,12 +59,15 @@ def match_competitors_to_catalog(
     matched = scraped.dropna(subset=["matched_sku"])
     
     # Форматируем результат
+    columns = ["source_site", "comp_name", "comp_price", "comp_url", "sku", "match_score"]
+    if "scraped_at" in matched.columns:
+        columns.append("scraped_at")
     result = matched.rename(columns={
         "site": "source_site",
         "name": "comp_name",
         "price": "comp_price",
         "url": "comp_url",
         "matched_sku": "sku",
-    })[["source_site", "comp_name", "comp_price", "comp_url", "sku", "match_score"]]
+    })[columns]
     
     return result
\ No newline at end of file
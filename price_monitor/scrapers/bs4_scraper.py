@@ -12,13 +12,57 @@ HEADERS = {
     "Connection": "keep-alive"
 }
 
-def scrape_bs4(site_cfg: dict) -> list:
-    """Парсинг статических сайтов с помощью BeautifulSoup"""
+def extract_products(html: str, site_cfg: dict, page_url: str) -> list:
+    """Извлекает товары из HTML страницы по CSS-селекторам (bs4/Selenium)"""
     base_url = site_cfg.get("base_url", "")
-    list_urls = site_cfg["list_urls"]
     selectors = site_cfg["selectors"]
     price_regex = re.compile(site_cfg.get("price_regex", r"[\d\s,.]+"))
     
+    soup = BeautifulSoup(html, "lxml")
+    products = []
+    
+    # Поиск товарных карточек
+    for card in soup.select(selectors["item"]):
+        try:
+            # Извлечение данных
+            name_elem = card.select_one(selectors["name"])
+            price_elem = card.select_one(selectors["price"])
+            url_elem = card.select_one(selectors["url"])
+            
+            if not all([name_elem, price_elem, url_elem]):
+                continue
+            
+            name = name_elem.get_text(strip=True)
+            price_text = price_elem.get_text(strip=True)
+            
+            # Извлечение цены
+            price_match = price_regex.search(price_text)
+            price_value = parse_price(price_match.group(0)) if price_match else None
+            
+            if not price_value:
+                continue
+            
+            # Формирование полного URL
+            product_url = url_elem.get(selectors.get("attr_url", "href"))
+            full_url = urljoin(base_url, product_url) if product_url else page_url
+            
+            # Сохранение результата
+            products.append({
+                "site": site_cfg["name"],
+                "name": name,
+                "price": price_value,
+                "url": full_url
+            })
+            
+        except Exception as e:
+            print(f"  Ошибка обработки карточки: {str(e)}")
+    
+    return products
+
+def scrape_bs4(site_cfg: dict, archive=None) -> list:
+    """Парсинг статических сайтов с помощью BeautifulSoup"""
+    list_urls = site_cfg["list_urls"]
+    
     all_products = []
     
     for url in list_urls:
@@ -27,46 +71,16 @@ def scrape_bs4(site_cfg: dict) -> list:
             response = requests.get(url, headers=HEADERS, timeout=30)
             response.raise_for_status()
             
-            # Парсинг HTML
-            soup = BeautifulSoup(response.text, "lxml")
+            # Сохранение исходной страницы в архив
+            fetched_at = int(time.time())
+            if archive is not None:
+                archive.store(response.text, url, site_cfg["name"], "bs4", fetched_at)
             
-            # Поиск товарных карточек
-            product_cards = soup.select(selectors["item"])
-            
-            for card in product_cards:
-                try:
-                    # Извлечение данных
-                    name_elem = card.select_one(selectors["name"])
-                    price_elem = card.select_one(selectors["price"])
-                    url_elem = card.select_one(selectors["url"])
-                    
-                    if not all([name_elem, price_elem, url_elem]):
-                        continue
-                    
-                    name = name_elem.get_text(strip=True)
-                    price_text = price_elem.get_text(strip=True)
-                    
-                    # Извлечение цены
-                    price_match = price_regex.search(price_text)
-                    price_value = parse_price(price_match.group(0)) if price_match else None
-                    
-                    if not price_value:
-                        continue
-                    
-                    # Формирование полного URL
-                    product_url = url_elem.get(selectors.get("attr_url", "href"))
-                    full_url = urljoin(base_url, product_url) if product_url else url
-                    
-                    # Сохранение результата
-                    all_products.append({
-                        "site": site_cfg["name"],
-                        "name": name,
-                        "price": price_value,
-                        "url": full_url
-                    })
-                    
-                except Exception as e:
-                    print(f"  Ошибка обработки карточки: {str(e)}")
+            # Парсинг HTML
+            products = extract_products(response.text, site_cfg, url)
+            for product in products:
+                product["scraped_at"] = fetched_at
+            all_products.extend(products)
             
             # Задержка между запросами
             time.sleep(1.5)
@@ -74,4 +88,4 @@ def scrape_bs4(site_cfg: dict) -> list:
         except Exception as e:
             print(f"  Ошибка загрузки страницы {url}: {str(e)}")
     
-    return all_products
\ No newline at end of file
+    return all_products
@@ -1,16 +1,55 @@
 import re
+import time
 from urllib.parse import urljoin
 from scrapy.crawler import CrawlerProcess
 from scrapy import Spider
 from scrapy.http import Request, HtmlResponse
+from parsel import Selector
 from price_monitor.utils import parse_price
 
-def scrape_with_scrapy(site_cfg: dict) -> list:
-    """Запуск Scrapy паука для сбора данных"""
-    results = []
+def extract_products_css(html: str, site_cfg: dict, page_url: str) -> list:
+    """Извлекает товары из HTML по селекторам Scrapy (::text, ::attr)"""
     base_url = site_cfg.get("base_url", "")
     selectors = site_cfg["selectors"]
     price_regex = re.compile(site_cfg.get("price_regex", r"[\d\s,.]+"))
+    
+    products = []
+    
+    # Обработка карточек товаров
+    for card in Selector(text=html).css(selectors["item"]):
+        name = card.css(selectors["name"]).get()
+        price = card.css(selectors["price"]).get()
+        url = card.css(selectors["url"]).get()
+        
+        if not all([name, price, url]):
+            continue
+        
+        # Очистка названия
+        name_clean = re.sub(r"\s+", " ", name).strip()
+        
+        # Извлечение цены
+        price_match = price_regex.search(price)
+        price_value = parse_price(price_match.group(0)) if price_match else None
+        
+        if not price_value:
+            continue
+        
+        # Формирование полного URL
+        full_url = urljoin(base_url, url)
+        
+        # Сохранение результата
+        products.append({
+            "site": site_cfg["name"],
+            "name": name_clean,
+            "price": price_value,
+            "url": full_url
+        })
+    
+    return products
+
+def scrape_with_scrapy(site_cfg: dict, archive=None) -> list:
+    """Запуск Scrapy паука для сбора данных"""
+    results = []
     follow_links = site_cfg.get("follow_links", False)
 
     class GenericSpider(Spider):
@@ -30,46 +69,25 @@ def scrape_with_scrapy(site_cfg: dict) -> list:
                 yield Request(url, callback=self.parse)
 
         def parse(self, response):
-            # Обработка карточек товаров
-            for card in response.css(selectors["item"]):
-                name = card.css(selectors["name"]).get()
-                price = card.css(selectors["price"]).get()
-                url = card.css(selectors["url"]).get()
-                
-                if not all([name, price, url]):
-                    continue
-                
-                # Очистка названия
-                name_clean = re.sub(r"\s+", " ", name).strip()
-                
-                # Извлечение цены
-                price_match = price_regex.search(price)
-                price_value = parse_price(price_match.group(0)) if price_match else None
-                
-                if not price_value:
-                    continue
-                
-                # Формирование полного URL
-                full_url = urljoin(base_url, url)
-                
-                # Сохранение результата
-                results.append({
-                    "site": site_cfg["name"],
-                    "name": name_clean,
-                    "price": price_value,
-                    "url": full_url
-                })
-                
-                # Переход на страницу товара при необходимости
-                if follow_links:
+            # Сохранение исходной страницы в архив
+            fetched_at = int(time.time())
+            if archive is not None:
+                archive.store(response.text, response.url, site_cfg["name"], "scrapy", fetched_at)
+            
+            products = extract_products_css(response.text, site_cfg, response.url)
+            for product in products:
+                product["scraped_at"] = fetched_at
+            results.extend(products)
+            
+            # Переход на страницы товаров и пагинация (если нужно)
+            if follow_links:
+                for product in products:
                     yield response.follow(
-                        full_url, 
+                        product["url"], 
                         callback=self.parse_product,
-                        meta={"product": {"name": name_clean, "price": price_value}}
+                        meta={"product": {"name": product["name"], "price": product["price"]}}
                     )
-            
-            # Пагинация (если нужно)
-            if follow_links:
+                
                 next_page = response.css("a.next::attr(href)").get()
                 if next_page:
                     yield response.follow(next_page, callback=self.parse)
@@ -1,6 +1,4 @@
 import time
-import re
-from urllib.parse import urljoin
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -8,8 +6,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-from price_monitor.utils import parse_price
+from price_monitor.scrapers.bs4_scraper import extract_products
 
 def get_driver():
     """Создает и настраивает экземпляр драйвера Chrome"""
@@ -42,12 +39,10 @@ def get_driver():
     
     return driver
 
-def scrape_selenium(site_cfg: dict) -> list:
+def scrape_selenium(site_cfg: dict, archive=None) -> list:
     """Парсинг динамических сайтов с помощью Selenium"""
-    base_url = site_cfg.get("base_url", "")
     list_urls = site_cfg["list_urls"]
     selectors = site_cfg["selectors"]
-    price_regex = re.compile(site_cfg.get("price_regex", r"[\d\s,.]+"))
     need_scroll = site_cfg.get("scroll", False)
     
     driver = get_driver()
@@ -76,46 +71,17 @@ def scrape_selenium(site_cfg: dict) -> list:
                             break
                         last_height = new_height
                 
-                # Парсинг HTML
-                soup = BeautifulSoup(driver.page_source, "lxml")
-                
-                # Поиск товарных карточек
-                product_cards = soup.select(selectors["item"])
+                # Сохранение исходной страницы в архив
+                html = driver.page_source
+                fetched_at = int(time.time())
+                if archive is not None:
+                    archive.store(html, url, site_cfg["name"], "selenium", fetched_at)
                 
-                for card in product_cards:
-                    try:
-                        # Извлечение данных
-                        name_elem = card.select_one(selectors["name"])
-                        price_elem = card.select_one(selectors["price"])
-                        url_elem = card.select_one(selectors["url"])
-                        
-                        if not all([name_elem, price_elem, url_elem]):
-                            continue
-                        
-                        name = name_elem.get_text(strip=True)
-                        price_text = price_elem.get_text(strip=True)
-                        
-                        # Извлечение цены
-                        price_match = price_regex.search(price_text)
-                        price_value = parse_price(price_match.group(0)) if price_match else None
-                        
-                        if not price_value:
-                            continue
-                        
-                        # Формирование полного URL
-                        product_url = url_elem.get(selectors.get("attr_url", "href"))
-                        full_url = urljoin(base_url, product_url) if product_url else url
-                        
-                        # Сохранение результата
-                        all_products.append({
-                            "site": site_cfg["name"],
-                            "name": name,
-                            "price": price_value,
-                            "url": full_url
-                        })
-                        
-                    except Exception as e:
-                        print(f"  Ошибка обработки карточки: {str(e)}")
+                # Парсинг HTML
+                products = extract_products(html, site_cfg, url)
+                for product in products:
+                    product["scraped_at"] = fetched_at
+                all_products.extend(products)
                 
                 # Задержка между запросами
                 time.sleep(2)
@@ -0,0 +1,132 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# Параметры стратегии и их значения по умолчанию (как в build_recommendations)
+PARAMS = {
+    "min_margin_percent": 10,
+    "undercut_delta": 1.0,
+    "raise_delta": 0.5,
+    "tolerance_percent": 1.5,
+    "round_to": 1.0,
+}
+
+
+def build_param_grid(grid_cfg: dict, base_cfg: dict) -> pd.DataFrame:
+    """Декартово произведение значений параметров из simulation.yaml.
+
+    Параметры, не заданные в сетке, берутся из pricing.yaml.
+    """
+    values = {}
+    for name, default in PARAMS.items():
+        grid_values = (grid_cfg or {}).get(name)
+        if grid_values is None:
+            grid_values = [base_cfg.get(name, default)]
+        elif not isinstance(grid_values, list):
+            grid_values = [grid_values]
+        values[name] = grid_values
+
+    combos = itertools.product(*values.values())
+    return pd.DataFrame(list(combos), columns=list(values), dtype=float)
+
+
+def _simulate_chunk(our, min_comp, cost, median_comp, params: pd.DataFrame) -> dict:
+    """Правила build_recommendations для матрицы (конфигурации x SKU)"""
+    def col(name):
+        return params[name].to_numpy()[:, None]
+
+    min_margin = col("min_margin_percent") / 100
+    undercut_delta = col("undercut_delta")
+    raise_delta = col("raise_delta")
+    tolerance = col("tolerance_percent") / 100
+    round_step = col("round_to")
+
+    min_allowed = cost * (1 + min_margin)
+    has_comp = ~np.isnan(min_comp) & (min_comp != 0)
+    safe_comp = np.where(has_comp, min_comp, 1.0)
+    deviation = (our - safe_comp) / safe_comp
+
+    # Мы дороже конкурентов: снижаем, но не ниже минимальной маржи
+    above = has_comp & (our > safe_comp)
+    down = np.maximum(safe_comp - undercut_delta, min_allowed)
+    decrease = above & (down < our)
+
+    # Мы заметно дешевле конкурентов
+    below = has_comp & ~above & (np.abs(deviation) > tolerance)
+    up = np.minimum(safe_comp - raise_delta, min_allowed)
+    increase_comp = below & (up > our) & (up > min_allowed)
+
+    # Нет данных конкурентов: поднимаем до минимально допустимой
+    # (NaN, как и в build_recommendations, оставляет цену без изменений)
+    increase_floor = (min_comp == 0) & (our < min_allowed)
+
+    new_price = np.broadcast_to(our, decrease.shape).astype(float)
+    new_price = np.where(decrease, down, new_price)
+    new_price = np.where(increase_comp, up, new_price)
+    new_price = np.where(increase_floor, min_allowed, new_price)
+
+    # Округление цены (как round() в build_recommendations)
+    step = np.where(round_step > 0, round_step, 1.0)
+    new_price = np.where(round_step > 0, np.round(new_price / step) * step, new_price)
+
+    increase = increase_comp | increase_floor
+    margin_before = np.sum(our - cost)
+    margin_after = np.sum(new_price - cost, axis=1)
+    comp_count = has_comp.sum()
+
+    return {
+        "decrease": decrease.sum(axis=1),
+        "increase": increase.sum(axis=1),
+        "keep": (~decrease & ~increase).sum(axis=1),
+        "margin_before": np.full(len(params), margin_before),
+        "margin_after": margin_after,
+        "margin_delta": margin_after - margin_before,
+        "margin_percent_after": margin_after / np.sum(new_price, axis=1) * 100,
+        "cheapest_share": (
+            np.sum(has_comp & (new_price <= safe_comp), axis=1) / comp_count
+            if comp_count else np.full(len(params), np.nan)
+        ),
+        "below_median_share": (
+            np.sum(has_comp & (new_price <= median_comp), axis=1) / comp_count
+            if comp_count else np.full(len(params), np.nan)
+        ),
+        "avg_price_index": np.nanmean(
+            np.where(has_comp, new_price / safe_comp, np.nan), axis=1
+        ) if comp_count else np.full(len(params), np.nan),
+    }
+
+
+def simulate_strategies(
+    comparison: pd.DataFrame,
+    grid: pd.DataFrame,
+    chunk_cells: int = 2_000_000
+) -> pd.DataFrame:
+    """Оценивает все конфигурации сетки на текущем сравнении цен за один проход.
+
+    Для каждой конфигурации: число снижений/повышений, изменение маржи
+    и позиция на рынке после применения рекомендаций.
+    """
+    if comparison.empty or grid.empty:
+        return pd.DataFrame()
+
+    our = comparison["current_price"].to_numpy(dtype=float)
+    min_comp = comparison["min_comp_price"].to_numpy(dtype=float)
+    cost = comparison["cost"].to_numpy(dtype=float)
+    if "median_comp_price" in comparison.columns:
+        median_comp = comparison["median_comp_price"].to_numpy(dtype=float)
+    else:
+        median_comp = comparison["avg_comp_price"].to_numpy(dtype=float)
+
+    # Матрица конфигурации x SKU обрабатывается пачками, чтобы ограничить память
+    chunk = max(1, chunk_cells // len(our))
+    parts = []
+    for start in range(0, len(grid), chunk):
+        params = grid.iloc[start:start + chunk]
+        metrics = _simulate_chunk(our, min_comp, cost, median_comp, params)
+        parts.append(pd.concat(
+            [params.reset_index(drop=True), pd.DataFrame(metrics)], axis=1
+        ))
+
+    result = pd.concat(parts, ignore_index=True)
+    return result.sort_values("margin_delta", ascending=False, ignore_index=True)
@@ -0,0 +1,177 @@
+import random
+import statistics
+
+import pandas as pd
+
+from price_monitor.aggregates import PriceAggregator, RollingWindow, SkuAggregates
+from price_monitor.compare import build_price_comparison
+
+NOW = 1_000_000
+HOUR = 3600
+DAY = 86400
+
+
+def matched_row(site, price, ts, sku=2001.0, url=None):
+    return {
+        "source_site": site,
+        "comp_name": f"{site} item",
+        "comp_price": price,
+        "comp_url": url or f"https://{site}/item",
+        "sku": sku,
+        "match_score": 90,
+        "scraped_at": ts,
+    }
+
+
+def test_rolling_window_matches_brute_force():
+    """Окно совпадает с пересчетом по всем наблюдениям, в т.ч. не по порядку"""
+    rng = random.Random(0)
+    window = RollingWindow(100)
+    history = []
+    now = float("-inf")
+
+    for _ in range(2000):
+        ts = rng.randint(0, 3000)
+        price = rng.choice([1, 2, 3, 5.5, 8, 13, 21])
+        if rng.random() < 0.1:
+            moment = rng.randint(0, 3000)
+            window.evict(moment)
+            now = max(now, moment)
+
+        window.add(ts, price)
+        now = max(now, ts)
+        if ts > now - 100:
+            history.append((ts, price))
+
+        current = [p for t, p in history if t > now - 100]
+        stats = window.stats()
+        assert stats["count"] == len(current)
+        if current:
+            assert stats["min"] == min(current)
+            assert stats["max"] == max(current)
+            assert abs(stats["mean"] - sum(current) / len(current)) < 1e-9
+            assert stats["median"] == statistics.median(current)
+
+
+def test_window_evicts_expired_prices():
+    window = RollingWindow(HOUR)
+    window.add(NOW - 2 * HOUR, 1.0)
+    window.add(NOW - 10, 7.0)
+    window.add(NOW - 5, 3.0)
+    window.evict(NOW)
+
+    assert window.stats() == {"count": 2, "min": 3.0, "max": 7.0, "mean": 5.0, "median": 5.0}
+
+
+def test_stale_observation_does_not_enter_short_window():
+    """Старая цена, пришедшая после свежей, не попадает в окно 1h"""
+    store = PriceAggregator()
+    store.add(2001, "siteA", 500, ts=NOW - 60)
+    store.add(2001, "siteB", 100, ts=NOW - 5 * DAY)
+
+    hourly = store.to_frame("1h", now=NOW).iloc[0]
+    assert hourly["min_comp_price"] == 500
+    assert hourly["competitors"] == 1
+    assert hourly["latest_prices"] == {"siteA": 500}
+
+    weekly = store.to_frame("7d", now=NOW).iloc[0]
+    assert weekly["min_comp_price"] == 100
+    assert weekly["competitors"] == 2
+
+
+def test_latest_price_not_replaced_by_older_observation():
+    agg = SkuAggregates({"7d": 7 * DAY})
+    agg.add(NOW - 60, "siteA", 500, url="u1")
+    agg.add(NOW - DAY, "siteA", 450, url="u1")
+
+    assert agg.latest[("siteA", "u1")]["price"] == 500
+    assert agg.windows["7d"].stats()["count"] == 2
+
+
+def test_listings_of_one_site_are_kept_separately():
+    """Два предложения одного сайта учитываются оба, latest_prices - минимум"""
+    store = PriceAggregator()
+    store.add(2001, "siteA", 500, ts=NOW - 60, url="u1")
+    store.add(2001, "siteA", 900, ts=NOW - 30, url="u2")
+
+    row = store.to_frame("1h", now=NOW).iloc[0]
+    assert row["latest_prices"] == {"siteA": 500}
+    assert row["competitors"] == 1
+    assert row["avg_comp_price"] == 700
+    assert row["median_comp_price"] == 700
+
+
+def test_market_stats_are_not_weighted_by_scrape_frequency():
+    """Сайт, опрошенный 10 раз, весит в avg/median как одно предложение"""
+    store = PriceAggregator()
+    for i in range(10):
+        store.add(2001, "a", 100, ts=NOW - 100 + i, url="ua")
+    store.add(2001, "b", 1000, ts=NOW - 50, url="ub")
+
+    row = store.to_frame("1h", now=NOW).iloc[0]
+    assert row["avg_comp_price"] == 550
+    assert row["median_comp_price"] == 550
+    assert row["min_comp_price"] == 100
+    assert row["max_comp_price"] == 1000
+    assert row["observations"] == 11
+    assert abs(row["window_avg_price"] - 2000 / 11) < 1e-9
+    assert row["window_median_price"] == 100
+
+
+def test_update_skips_seen_observations():
+    store = PriceAggregator()
+    matched = pd.DataFrame([
+        matched_row("siteA", 500, NOW - 60),
+        matched_row("siteB", 520, NOW - 60),
+    ])
+
+    assert store.update(matched) == 2
+    assert store.update(matched) == 0
+    assert store.to_frame("24h", now=NOW).iloc[0]["observations"] == 2
+
+
+def test_sku_keys_join_catalog():
+    """SKU 2001.0 из matched соединяется с SKU 2001 каталога"""
+    catalog = pd.DataFrame([{
+        "sku": 2001, "name": "ASUS VivoBook", "brand": "ASUS",
+        "category": "laptops", "cost": 400, "current_price": 550,
+    }])
+    matched = pd.DataFrame([matched_row("siteA", 530, NOW - 60)])
+    store = PriceAggregator()
+    store.update(matched)
+
+    comp = build_price_comparison(matched, catalog, store.to_frame("24h", now=NOW))
+    assert comp["sku"].tolist() == [2001]
+    assert comp.iloc[0]["latest_prices"] == {"siteA": 530.0}
+
+
+def test_removed_catalog_sku_is_skipped():
+    """SKU из сохраненных агрегатов, удаленный из каталога, не ломает сравнение"""
+    catalog = pd.DataFrame([{
+        "sku": 2001, "name": "ASUS VivoBook", "brand": "ASUS",
+        "category": "laptops", "cost": 400, "current_price": 550,
+    }])
+    store = PriceAggregator()
+    store.add("OLD-1", "siteA", 100, ts=NOW - 60)
+    store.add(2001, "siteA", 530, ts=NOW - 60)
+
+    comp = build_price_comparison(pd.DataFrame(), catalog, store.to_frame("24h", now=NOW))
+    assert comp["sku"].tolist() == [2001]
+
+
+def test_save_load_round_trip(tmp_path):
+    path = tmp_path / "price_aggregates.json"
+    store = PriceAggregator()
+    store.update(pd.DataFrame([
+        matched_row("siteA", 500, NOW - 60),
+        matched_row("siteB", 480, NOW - 2 * HOUR),
+        matched_row("siteC", 450, NOW - 3 * DAY, sku="A-1"),
+    ]))
+    store.save(path)
+    loaded = PriceAggregator.load(path)
+
+    for window in ("1h", "24h", "7d"):
+        expected = store.to_frame(window, now=NOW)
+        pd.testing.assert_frame_equal(loaded.to_frame(window, now=NOW), expected)
+    assert loaded.add(2001, "siteA", 500, ts=NOW - 60, url="https://siteA/item") is False
+
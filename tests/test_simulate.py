@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from price_monitor.recommend import build_recommendations
+from price_monitor.simulate import build_param_grid, simulate_strategies
+
+
+def random_comparison(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    cost = rng.uniform(10, 500, n).round()
+    min_comp = (cost * rng.uniform(0.9, 1.7, n)).round(1)
+    min_comp[rng.random(n) < 0.1] = 0  # нет данных конкурентов
+    min_comp[3] = np.nan
+    comparison = pd.DataFrame({
+        "sku": range(n),
+        "name": [f"item {i}" for i in range(n)],
+        "cost": cost,
+        "current_price": (cost * rng.uniform(1.0, 1.6, n)).round(),
+        "min_comp_price": min_comp,
+    })
+    comparison["avg_comp_price"] = comparison["min_comp_price"] * 1.1
+    comparison["median_comp_price"] = comparison["min_comp_price"] * 1.05
+    return comparison
+
+
+def test_simulation_matches_build_recommendations():
+    """Каждая конфигурация сетки дает те же действия и маржу, что и recommend"""
+    comparison = random_comparison()
+    grid = build_param_grid({
+        "min_margin_percent": [0, 10, 30],
+        "undercut_delta": [0, 1.0, 5.0],
+        "raise_delta": [0, 0.5],
+        "tolerance_percent": [0, 1.5, 10],
+        "round_to": [0, 1.0, 10.0],
+    }, {})
+
+    results = simulate_strategies(comparison, grid)
+    assert len(results) == len(grid)
+
+    for _, row in results.iterrows():
+        cfg = {name: row[name] for name in grid.columns}
+        recs = build_recommendations(comparison, None, cfg)
+        actions = recs["action"].value_counts()
+
+        assert row["decrease"] == actions.get("decrease", 0), cfg
+        assert row["increase"] == actions.get("increase", 0), cfg
+        assert row["keep"] == actions.get("keep", 0), cfg
+        margin = (recs["recommended_price"] - comparison["cost"]).sum()
+        assert abs(row["margin_after"] - margin) < 1e-6, cfg
+
+
+def test_param_grid_falls_back_to_pricing_config():
+    grid = build_param_grid({"undercut_delta": [0.5, 1.0]}, {"min_margin_percent": 15})
+
+    assert len(grid) == 2
+    assert set(grid["min_margin_percent"]) == {15}
+    assert set(grid["raise_delta"]) == {0.5}
+    assert sorted(grid["undercut_delta"]) == [0.5, 1.0]
+
+
+def test_chunking_does_not_change_results():
+    comparison = random_comparison(n=20, seed=1)
+    grid = build_param_grid({"min_margin_percent": [5, 10, 20], "round_to": [0, 1.0]}, {})
+
+    whole = simulate_strategies(comparison, grid)
+    chunked = simulate_strategies(comparison, grid, chunk_cells=len(comparison))
+    pd.testing.assert_frame_equal(
+        chunked.sort_values(list(grid.columns), ignore_index=True),
+        whole.sort_values(list(grid.columns), ignore_index=True),
+    )